@@ -1,6 +1,16 @@
+import asyncio
+import copy
+import mmap
 import os
 import re
+import signal
 import subprocess
+import sys
+from collections import OrderedDict
+from functools import lru_cache
+from io import StringIO
+
+import numpy as np
 from mcp.server.fastmcp import FastMCP
 
 # Create an MCP server
@@ -9,6 +19,80 @@ mcp = FastMCP("Gaussian")
 path_default = "/data/corp/qun.zeng/mcp_tmp"
 multiwfn_default = "/home/ssr/app/multiwfn/Multiwfn"
 
+# Set GAUSSIAN_MCP_DEBUG to print inputs and parsing steps to stderr
+_DEBUG = bool(os.environ.get("GAUSSIAN_MCP_DEBUG"))
+
+# Multiwfn results of analyze_esp_surface, least recently used first
+_ESP_CACHE = OrderedDict()
+_ESP_CACHE_SIZE = 128
+
+# Start of the next header line in a fchk file (headers have no leading whitespace)
+_FCHK_HEADER_RE = re.compile(rb"\n(?=\S)")
+
+# Record layout of an XYZ atom line: symbol (kept at full length), x, y, z
+_XYZ_DTYPE = [("symbol", object), ("x", "f8"), ("y", "f8"), ("z", "f8")]
+# Formatter of a Gaussian atom line, the template is parsed only once
+_ATOM_FMT = "{:>2} {:>12.6f} {:>12.6f} {:>12.6f}\n".format
+
+# Regular expressions for the Multiwfn quantitative surface analysis output
+_AREA_PATTERNS = {
+    "total": r"Overall surface area:\s+(\S+)\s+Bohr\^2\s+\(\s+(\S+)\s+Angstrom\^2\)",
+    "positive": r"Positive surface area:\s+([\d.]+)\s+Bohr\^2\s+\(\s+([\d.]+)\s+Angstrom\^2\)",
+    "negative": r"Negative surface area:\s+([\d.]+)\s+Bohr\^2\s+\(\s+([\d.]+)\s+Angstrom\^2\)"
+}
+_STATS_PATTERNS = {
+    "overall_avg": r"Overall average value:\s+([\d.-]+)\s+a\.u\.",
+    "positive_avg": r"Positive average value:\s+([\d.-]+)\s+a\.u\.",
+    "negative_avg": r"Negative average value:\s+([\d.-]+)\s+a\.u\.",
+    "total_variance": r"Overall variance.*?:\s+([\d.]+)\s+a\.u\.\^2",
+    "positive_variance": r"Positive variance:\s+([\d.]+)\s+a\.u\.\^2",
+    "negative_variance": r"Negative variance:\s+([\d.]+)\s+a\.u\.\^2",
+    "charge_balance": r"Balance of charges \(nu\):\s+([\d.-]+)",
+    "internal_separation": r"Internal charge separation \(Pi\):\s+([\d.-]+)\s+a\.u\.",
+    "molecular_polarity": r"Molecular polarity index \(MPI\):\s+([\d.]+)\s+eV"
+}
+_SKEW_PATTERNS = {
+    "overall": r"Overall skewness:\s+([\d.-]+)",
+    "positive": r"Positive skewness:\s+([\d.-]+)",
+    "negative": r"Negative skewness:\s+([\d.-]+)"
+}
+_SURFACE_PATTERNS = {
+    "volume": r"Volume:\s+([\d.]+)\s+Bohr\^3\s+\(\s+([\d.]+)\s+Angstrom\^3\)",
+    "density": r"Estimated density.*?([\d.]+)\s+g/cm\^3",
+    "esp_min": r"Minimal value:\s+([\d.-]+)\s+kcal/mol",
+    "esp_max": r"Maximal value:\s+([\d.-]+)\s+kcal/mol",
+    **{f"area_{k}": v for k, v in _AREA_PATTERNS.items()},
+    **{f"stats_{k}": v for k, v in _STATS_PATTERNS.items()},
+    "polarity": (r"Nonpolar surface area.*?([\d.]+)\s+Angstrom\^2\s+\(\s+([\d.]+)\s+\%\)\s+"
+                 r"Polar surface area.*?([\d.]+)\s+Angstrom\^2\s+\(\s+([\d.]+)\s+"),
+    **{f"skew_{k}": v for k, v in _SKEW_PATTERNS.items()},
+    "minima": r"Global surface minimum:\s+[\S]+ a.u. at\s+(\S+)\s+(\S+)\s+(\S+) Ang"
+}
+
+def _index_branches(patterns):
+    """
+    Map match.lastindex of every branch of the alternation built from patterns
+    to the name of the branch and the indices of its value groups.
+    """
+    branches = {}
+    first = 1
+    for name, pattern in patterns.items():
+        ngroups = re.compile(pattern).groups
+        branches[first + ngroups - 1] = (name, range(first, first + ngroups))
+        first += ngroups
+    return branches
+
+# One alternation of all quantities, so the output is scanned only once.
+# The branches are not wrapped in named groups, which would disable the
+# first-character search of the re module and make the scan much slower.
+_SURFACE_RE = re.compile("|".join(f"(?:{v})" for v in _SURFACE_PATTERNS.values()))
+_SURFACE_BRANCHES = _index_branches(_SURFACE_PATTERNS)
+
+def _debug(*args):
+    """Print debugging output to stderr, only when _DEBUG is set."""
+    if _DEBUG:
+        print(*args, file=sys.stderr)
+
 def parse_xyz_content(content):
     """
     This function interprets the content in the XYZ format strings to a list of atoms for Gaussian.
@@ -23,7 +107,7 @@ def parse_xyz_content(content):
     returns:
         list: [(symbol, x, y, z), ...]
     """
-    print(content)
+    _debug(content)
     lines = content.strip().split('\n')
     atoms = []
     
@@ -32,6 +116,17 @@ def parse_xyz_content(content):
     if len(lines) > 0 and lines[0].isdigit():
         start_index = 2
     
+    # Fast path: tokenize and convert the coordinates in C with NumPy
+    body = "\n".join(lines[start_index:])
+    if body.strip():
+        try:
+            table = np.loadtxt(StringIO(body), dtype=_XYZ_DTYPE, usecols=(0, 1, 2, 3),
+                               comments=None, ndmin=1)
+            coords = np.column_stack((table["x"], table["y"], table["z"])).tolist()
+            return list(zip(table["symbol"].tolist(), coords))
+        except ValueError:
+            pass  # Malformed lines, use the line-by-line parser below
+    
     for line in lines[start_index:]:
         if not line.strip():  # Skip empty lines
             continue
@@ -76,34 +171,62 @@ def xyz_to_gaussian_opt(xyz_string, jobname, method='b3lyp', basis='6-31g(d)',
         raise ValueError("No valid atoms found in the provided XYZ content.")
     
     # Generate Gaussian input file
-    input_string =  ""
-    # 1. Resource settings
-    input_string += f"%chk={jobname.strip()}.chk\n"
-    input_string += f"%mem={mem}\n"
-    input_string += f"%nprocshared={nproc}\n\n"
-        
-    # 2. Route section (calculation settings)
-    input_string += f"# opt {method}/{basis}\n\n"
+    parts = [
+        # 1. Resource settings
+        f"%chk={jobname.strip()}.chk\n",
+        f"%mem={mem}\n",
+        f"%nprocshared={nproc}\n\n",
+        # 2. Route section (calculation settings)
+        f"# opt {method}/{basis}\n\n",
+    ]
         
     # 3. Title line (avoid special characters)
     clean_title = ''.join(c if c.isalnum() or c in ' -_' else '_' for c in title)
-    input_string += f"{clean_title}\n\n"
+    parts.append(f"{clean_title}\n\n")
         
     # 4. Charge and spin multiplicity
-    input_string += f"{charge} {multiplicity}\n"
+    parts.append(f"{charge} {multiplicity}\n")
         
     # 5. Atomic coordinates (unit: Å)
     for atom_symbol, coords in atoms:
         x, y, z = coords
-        input_string += f"{atom_symbol:>2} {x:>12.6f} {y:>12.6f} {z:>12.6f}\n"
+        parts.append(_ATOM_FMT(atom_symbol, x, y, z))
         
     # 6. End with blank lines
-    input_string +="\n\n\n"
+    parts.append("\n\n\n")
     
-    return input_string
+    return "".join(parts)
+
+async def _run_process(cmd, cwd, timeout=None, input=None, stdout=subprocess.DEVNULL,
+                       stderr=subprocess.PIPE):
+    """
+    Run an external program without blocking the event loop, so several jobs can run at once.
+    Like subprocess.run, input (bytes) is piped to stdin and the program is killed together with
+    the programs it started when the time-out expires or the calling task is cancelled.
+    Returns (returncode, stdout, stderr); captured streams are bytes, the others None.
+    """
+    proc = await asyncio.create_subprocess_exec(
+        *cmd, stdin=subprocess.DEVNULL if input is None else subprocess.PIPE,  # stdin of the server is the MCP stream
+        stdout=stdout, stderr=stderr, cwd=cwd,
+        start_new_session=True  # own process group, so the programs it starts can be killed with it
+    )
+    try:
+        out, err = await asyncio.wait_for(proc.communicate(input), timeout=timeout)
+    except BaseException:
+        # Time-out, cancellation or shutdown: kill the whole job, g16 runs every link as a child process
+        if proc.returncode is None:
+            try:
+                os.killpg(proc.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            # Close the pipes instead of waiting for them, a process that left the group may still hold them
+            proc._transport.close()
+            await proc.wait()
+        raise
+    return proc.returncode, out, err
 
 @mcp.tool()
-def gaussian_exec(input_string, filename, path=path_default, timeout=None):
+async def gaussian_exec(input_string, filename, path=path_default, timeout=None):
     """
     This funciton executes Gaussian calculations in Linux, do not modify input_string.
     Parameters:
@@ -119,35 +242,30 @@ def gaussian_exec(input_string, filename, path=path_default, timeout=None):
     """
     try:
         #if filename[-4:] not in [".com", ".gjf"]: filename +=".com"
-        print("input name", filename)
-        print(input_string)
+        _debug("input name", filename)
+        _debug(input_string)
         if path[-1]!="/": path+="/"
-        path_old = os.getcwd()
-        os.chdir(path)
         # 1. Safely write file (avoid overwrite risk
-        with open(filename, "w", encoding="utf-8") as f:
+        with open(path+filename, "w", encoding="utf-8") as f:
             f.write(input_string + "\n\n")
         
-        # 2. Use subprocess instead of os.popen (safer and more efficient)
+        # 2. Run g16 without blocking other tool calls (g16 writes its own .log, only stderr is reported)
         cmd = ["g16", filename]
-        result = subprocess.run(
+        returncode, _, stderr = await _run_process(
             cmd,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
+            cwd=path,  # run in the job directory without changing the server's cwd
             timeout=timeout  # avoid hanging
         )
         
         # 3. Error handling (log/raise)
-        if result.returncode != 0:
-            error_msg = f"Gaussian failed (Code: {result.returncode})\n Error:\n{result.stderr}"
+        if returncode != 0:
+            error_msg = f"Gaussian failed (Code: {returncode})\n Error:\n{stderr.decode(errors='replace')}"
             raise RuntimeError(error_msg)
-        os.chdir(path_old)    
-        return result.returncode
+        return returncode
     
     except FileNotFoundError:
         raise RuntimeError("Can not found Gaussian 'g16'")
-    except subprocess.TimeoutExpired:
+    except asyncio.TimeoutError:
         raise RuntimeError(f"Gaussian time-out {timeout} seconds)")
 
 @mcp.tool()
@@ -164,63 +282,63 @@ def extract_optimized_structure(filename, path=path_default):
     returns:
         list or None: list of optimized structure or None if the optimization failed
     """
-    # Map from atomic number to element symbol
-    atomic_num_to_symbol = {
-        1: 'H', 2: 'He', 3: 'Li', 4: 'Be', 5: 'B', 6: 'C', 7: 'N', 8: 'O',
-        9: 'F', 10: 'Ne', 11: 'Na', 12: 'Mg', 13: 'Al', 14: 'Si', 15: 'P',
-        16: 'S', 17: 'Cl', 18: 'Ar', 19: 'K', 20: 'Ca'
-        # Extend with more elements as needed
-    }
-    
     try:
         if filename[-4:] not in [".com", ".gjf"]: filename +=".com"
         log_name = filename[:-4] + ".log"
         if path[-1]!="/": path += "/"
-        print("log name", log_name)
-        with open(path+log_name, 'r') as f:
-            log_content = f.read()
+        _debug("log name", log_name)
+        log_path = os.path.abspath(path+log_name)
+        stat = os.stat(log_path)
+        return copy.deepcopy(_extract_optimized_structure(log_path, stat.st_mtime_ns, stat.st_size))
+    
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return None
+
+@lru_cache(maxsize=128)
+def _extract_optimized_structure(log_path, mtime_ns, size):
+    """
+    Parse the last optimized structure from a Gaussian log file.
+    mtime_ns and size are only part of the cache key, so an updated log is parsed again.
+    """
+    with open(log_path, 'rb') as f, \
+         mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as log_content:
         # Check whether optimization terminated normally [1,2](@ref)
-        if "Normal termination" not in log_content:
-            print("A")
+        # Both markers sit near the end and the termination follows the last completed
+        # optimization, so only the tail after that optimization is searched for it
+        iopt = log_content.rfind(b"Optimization completed.")
+        if iopt < 0:
+            _debug("B")
             return None
-        print("A+")
+        _debug("B+")
         
-        if "Optimization completed." not in log_content:
-            print("B")
+        if log_content.find(b"Normal termination", iopt) < 0:
+            _debug("A")
             return None
-        print("B+")
+        _debug("A+")
 
         # Locate the last optimized structure (Standard orientation) [1,2](@ref)
         
-        log_lines = log_content.split("\n")
-        iline = 0
-        for i,line in enumerate(log_lines):
-            if re.search("Optimization completed.", line):
-                iline = i
-                break
-        for i,line in enumerate(log_lines[iline:]):
-            if re.search("Standard orientation", line):
-                iline += i
-                break
-
-        atoms = []
-        for line in log_lines[iline+5:]:
-            if re.search("-------", line):
-                break
-            tmp = line.split()
-            symbol = int(tmp[1])
-            x = float(tmp[-3])
-            y = float(tmp[-2])
-            z = float(tmp[-1])
-            atoms.append([symbol, x, y, z])
-        return atoms if atoms else None
-    
-    except Exception as e:
-        print(f"Error: {e}")
-        return None
+        istd = log_content.find(b"Standard orientation", iopt)
+        if istd < 0:
+            return None
+        # The coordinate rows lie between the second and the third dashed rule of the block
+        rules = []
+        irule = istd
+        for _ in range(3):
+            irule = log_content.find(b"\n ---", irule + 1)
+            if irule < 0:
+                return None
+            rules.append(irule)
+        rows = log_content[log_content.find(b"\n", rules[1] + 1) + 1:rules[2]].decode()
+
+    # Columns: center number, atomic number, (atomic type,) X, Y, Z
+    atoms = [[int(tmp[1]), float(tmp[-3]), float(tmp[-2]), float(tmp[-1])]
+             for tmp in map(str.split, rows.splitlines())]
+    return atoms if atoms else None
 
 @mcp.tool()
-def formchk(chk_name, path=path_default):
+async def formchk(chk_name, path=path_default):
     """
     The function formchk is used to convert chk file to fchk file
     Use the binary executable formchk to convert the $jobname.chkfile into the corresponding fchk file.    
@@ -237,20 +355,11 @@ def formchk(chk_name, path=path_default):
         0 (Normal Exit) or None (Error Exit)
     """
     try:
-        path_old = os.getcwd()
-        os.chdir(path)
         cmd = ["formchk", chk_name]
-        result = subprocess.run(
-            cmd,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
-            timeout=1000  # avoid hanging
-            )
-        os.chdir(path_old)
+        await _run_process(cmd, cwd=path, timeout=1000)  # avoid hanging
         return 0
     except Exception as e:
-        print("formchk process error: {e}")
+        print(f"formchk process error: {e}", file=sys.stderr)
         return None
 
 
@@ -268,36 +377,45 @@ def extract_fchk_data(fchk_name, path=path_default):
     Returns:
         dict: A dictionary containing the properties of the file.
     """
+    fchk_path = os.path.abspath(os.path.join(path, fchk_name))
+    stat = os.stat(fchk_path)
+    return dict(_extract_fchk_data(fchk_path, stat.st_mtime_ns, stat.st_size))
+
+@lru_cache(maxsize=128)
+def _extract_fchk_data(fchk_path, mtime_ns, size):
+    """
+    Read energy, HOMO and LUMO from a fchk file.
+    mtime_ns and size are only part of the cache key, so an updated fchk is read again.
+    """
     data = {"Energy": None, "HOMO": None, "LUMO": None}
-    path_old = os.getcwd()
-    os.chdir(path)
-    with open(fchk_name, 'r') as f:
-        lines = f.readlines()
-    
-    iline = 0
-    for i, line in enumerate(lines):
-        if "Total Energy" in line:
-            data["Energy"] = float(line.split()[-1])  # Hartree
-        if "Number of electrons" in line:
-            data["Ne"] = int(line.split()[-1]) # 
-        elif "Alpha Orbital Energies" in line:
-            iline = i
-            break
-
-    nbasis = int(lines[iline].split()[-1])
-    if nbasis % 5 == 0: 
-        nline = nbasis//5
-    else:
-        nline = nbasis//5 + 1
-    # Parse orbital energy list
-    orb_energies = []
-    for i in range(nline):
-        orb_energies += list(map(float, lines[i+iline+1].split()))
-    data["HOMO"] = orb_energies[data["Ne"]//2-1]
-    data["LUMO"] = orb_energies[data["Ne"]//2]
-    os.chdir(path_old)
+    with open(fchk_path, 'rb') as f, \
+         mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as fchk:
+        # Header lines start at column 0, the wanted ones all come before the orbital energies
+        p_alpha = fchk.find(b"\nAlpha Orbital Energies")
+        if p_alpha < 0:
+            raise ValueError(f"No Alpha Orbital Energies in {fchk_path}")
+        p_energy = fchk.find(b"\nTotal Energy", 0, p_alpha)
+        if p_energy >= 0:
+            data["Energy"] = float(_fchk_line_value(fchk, p_energy))  # Hartree
+        p_ne = fchk.find(b"\nNumber of electrons", 0, p_alpha)
+        if p_ne >= 0:
+            data["Ne"] = int(_fchk_line_value(fchk, p_ne))
+        nbasis = int(_fchk_line_value(fchk, p_alpha))
+
+        # Only the orbital energy block is decoded, it ends at the next header line
+        start = fchk.find(b"\n", p_alpha + 1) + 1
+        end = _FCHK_HEADER_RE.search(fchk, start)
+        block = fchk[start:end.start() if end else len(fchk)]
+    orb_energies = np.fromstring(block.decode(), sep=" ")[:nbasis]
+    data["HOMO"] = float(orb_energies[data["Ne"]//2-1])
+    data["LUMO"] = float(orb_energies[data["Ne"]//2])
     return data
 
+def _fchk_line_value(fchk, pos):
+    """Return the last field (bytes) of the line that starts at pos + 1 in the mapped fchk file."""
+    eol = fchk.find(b"\n", pos + 1)
+    return fchk[pos:eol if eol >= 0 else len(fchk)].split()[-1]
+
 def parse_multiwfn_surface_analysis(log_text):
     """
     The function is used to parse the output results of quantitative molecular surface analysis from multiwfn.
@@ -320,94 +438,68 @@ def parse_multiwfn_surface_analysis(log_text):
         "minima": None         # Coordinates of global minimum
     }
     
+    # Scan the output once and keep the first match of every quantity
+    found = {}
+    for match in _SURFACE_RE.finditer(log_text):
+        name, groups = _SURFACE_BRANCHES[match.lastindex]
+        if name not in found:
+            found[name] = [match.group(i) for i in groups]
+            if len(found) == len(_SURFACE_PATTERNS):
+                break  # Everything found, skip the rest of the output
+    
     # 1. Extract volume and density
-    vol_match = re.search(r"Volume:\s+([\d.]+)\s+Bohr\^3\s+\(\s+([\d.]+)\s+Angstrom\^3\)", log_text)
-    #vol = re.search(r"Volume:\s+(\S+)\s+Bohr\^3\s+\(\s+(\S+)\s+Angstrom\^3\)", log_text)
-    if vol_match:
+    if "volume" in found:
         results["volume"] = {
-            "Bohr^3": float(vol_match.group(1)),
-            "Angstrom^3": float(vol_match.group(2))
+            "Bohr^3": float(found["volume"][0]),
+            "Angstrom^3": float(found["volume"][1])
         }
     
-    density_match = re.search(r"Estimated density.*?([\d.]+)\s+g/cm\^3", log_text)
-    if density_match:
-        results["density"] = float(density_match.group(1))
+    if "density" in found:
+        results["density"] = float(found["density"][0])
     
     # 2. Range of electrostatic potential (ESP)
-    esp_min = re.search(r"Minimal value:\s+([\d.-]+)\s+kcal/mol", log_text)
-    esp_max = re.search(r"Maximal value:\s+([\d.-]+)\s+kcal/mol", log_text)
-    if esp_min and esp_max:
+    if "esp_min" in found and "esp_max" in found:
         results["esp_range"] = {
-            "min_kcal/mol": float(esp_min.group(1)),
-            "max_kcal/mol": float(esp_max.group(1))
+            "min_kcal/mol": float(found["esp_min"][0]),
+            "max_kcal/mol": float(found["esp_max"][0])
         }
     
     # 3. Surface area statistics (with unit conversion)
-    area_patterns = [
-        ("total", r"Overall surface area:\s+(\S+)\s+Bohr\^2\s+\(\s+(\S+)\s+Angstrom\^2\)"),
-        ("positive", r"Positive surface area:\s+([\d.]+)\s+Bohr\^2\s+\(\s+([\d.]+)\s+Angstrom\^2\)"),
-        ("negative", r"Negative surface area:\s+([\d.]+)\s+Bohr\^2\s+\(\s+([\d.]+)\s+Angstrom\^2\)")
-    ]
-    for key, pattern in area_patterns:
-        match = re.search(pattern, log_text)
-        if match:
+    for key in _AREA_PATTERNS:
+        if f"area_{key}" in found:
             results["surface_area"][key] = {
-                "Bohr^2": float(match.group(1)),
-                "Angstrom^2": float(match.group(2))
+                "Bohr^2": float(found[f"area_{key}"][0]),
+                "Angstrom^2": float(found[f"area_{key}"][1])
             }
     
     # 4. ESP statistical moments
-    stats_patterns = {
-        "overall_avg": r"Overall average value:\s+([\d.-]+)\s+a\.u\.",
-        "positive_avg": r"Positive average value:\s+([\d.-]+)\s+a\.u\.",
-        "negative_avg": r"Negative average value:\s+([\d.-]+)\s+a\.u\.",
-        "total_variance": r"Overall variance.*?:\s+([\d.]+)\s+a\.u\.\^2",
-        "positive_variance": r"Positive variance:\s+([\d.]+)\s+a\.u\.\^2",
-        "negative_variance": r"Negative variance:\s+([\d.]+)\s+a\.u\.\^2",
-        "charge_balance": r"Balance of charges \(nu\):\s+([\d.-]+)",
-        "internal_separation": r"Internal charge separation \(Pi\):\s+([\d.-]+)\s+a\.u\.",
-        "molecular_polarity": r"Molecular polarity index \(MPI\):\s+([\d.]+)\s+eV"
-    }
-    for key, pattern in stats_patterns.items():
-        match = re.search(pattern, log_text)
-        if match:
-            results["esp_stats"][key] = float(match.group(1))
+    for key in _STATS_PATTERNS:
+        if f"stats_{key}" in found:
+            results["esp_stats"][key] = float(found[f"stats_{key}"][0])
     
     # 5. Polarity partition
-    polarity_match = re.search(
-        r"Nonpolar surface area.*?([\d.]+)\s+Angstrom\^2\s+\(\s+([\d.]+)\s+\%\)\s+"
-        r"Polar surface area.*?([\d.]+)\s+Angstrom\^2\s+\(\s+([\d.]+)\s+",
-        log_text
-    )
-    if polarity_match:
+    if "polarity" in found:
         results["polarity"] = {
-            "nonpolar_area": float(polarity_match.group(1)),
-            "nonpolar_percent": float(polarity_match.group(2)),
-            "polar_area": float(polarity_match.group(3)),
-            "polar_percent": float(polarity_match.group(4))
+            "nonpolar_area": float(found["polarity"][0]),
+            "nonpolar_percent": float(found["polarity"][1]),
+            "polar_area": float(found["polarity"][2]),
+            "polar_percent": float(found["polarity"][3])
         }
     
     # 6. Skewness analysis
-    skew_patterns = {
-        "overall": r"Overall skewness:\s+([\d.-]+)",
-        "positive": r"Positive skewness:\s+([\d.-]+)",
-        "negative": r"Negative skewness:\s+([\d.-]+)"
-    }
-    for key, pattern in skew_patterns.items():
-        match = re.search(pattern, log_text)
-        if match:
-            results["skewness"][key] = float(match.group(1))
+    for key in _SKEW_PATTERNS:
+        if f"skew_{key}" in found:
+            results["skewness"][key] = float(found[f"skew_{key}"][0])
     
     # 7. Information about extrema
     "Global surface minimum: -0.027510 a.u. at  -0.225417   0.366873  -1.831106 Ang"
-    match = re.search(r"Global surface minimum:\s+[\S]+ a.u. at\s+(\S+)\s+(\S+)\s+(\S+) Ang",log_text)
-    if match:
-        results["minima"]= [float(match.group(1)), float(match.group(2)), float(match.group(3))]
+    if "minima" in found:
+        results["minima"] = [float(v) for v in found["minima"]]
     return results
 
 # Add an addition tool
 @mcp.tool()
-def analyze_esp_surface(fchk_path, multiwfn_path=multiwfn_default, path=path_default):
+async def analyze_esp_surface(fchk_path, multiwfn_path=multiwfn_default, path=path_default):
     """
     The tools is used to analyze the ESP surface form of Gaussian fchk file with multiwfn.
     
@@ -416,63 +508,57 @@ def analyze_esp_surface(fchk_path, multiwfn_path=multiwfn_default, path=path_def
         multiwfn_path(str):  a path for a binary executable multiwfn
         path(str): a path for a directory where the output files will be stored
     """
-    # Directly validate the user-provided path
-    if not os.path.isfile(multiwfn_path):
-        raise FileNotFoundError(f"The specified Multiwn executable file does not exist: {multiwfn_path}")
-    
-    # Use temporary files to ensure thread safety
-    #print(os.getcwd())
-    script_path = "multiwfn_script.txt"
-    output_path = "output.log"
-    
-    try:
-        path_old = os.getcwd()
-        os.chdir(path)
-        # Create Multiwfn command script
-        with open(script_path, "w", encoding="utf-8") as f:
-            f.write(f"{fchk_path}\n")  # input fchk file path
-            f.write("12\n")            # 12: quantitative molecular surface analysis
-            f.write("0\n")             # 0: default parameters
-            f.write("-1\n")            # 10: Export ESP extreme values data​
-            f.write("-1\n")             # 9: Export surface vertex data
-            f.write("q\n")             # q: quit
-
-        # Run Multiwfn
-        with open(script_path, "r", encoding="utf-8") as inp, \
-             open(output_path, "w", encoding="utf-8") as out:
-            subprocess.run(
-                [multiwfn_path],
-                stdin=inp,
-                stdout=out,
-                stderr=subprocess.STDOUT,
-                text=True,
-                check=True
-            )
-
-        # Parse results
-        
-        with open(output_path, "r", encoding="utf-8") as result_file:
-            #print(result_file.read())
-            results = parse_multiwfn_surface_analysis(result_file.read())
-        os.chdir(path_old)
+    # Results are cached per fchk file version, so an updated fchk is analyzed again
+    stat = os.stat(os.path.join(path, fchk_path))
+    key = (fchk_path, multiwfn_path, path, stat.st_mtime_ns, stat.st_size)
+    if key in _ESP_CACHE:
+        _ESP_CACHE.move_to_end(key)
+    else:
+        _ESP_CACHE[key] = await _analyze_esp_surface(fchk_path, multiwfn_path, path)
+        if len(_ESP_CACHE) > _ESP_CACHE_SIZE:
+            _ESP_CACHE.popitem(last=False)
+    return copy.deepcopy(_ESP_CACHE[key])
 
-        return results
+async def _analyze_esp_surface(fchk_path, multiwfn_path, path):
+    """
+    Run Multiwfn on a fchk file and parse the quantitative surface analysis.
+    """
+    # Multiwfn command script, piped to stdin
+    script = "".join([
+        f"{fchk_path}\n",  # input fchk file path
+        "12\n",            # 12: quantitative molecular surface analysis
+        "0\n",             # 0: default parameters
+        "-1\n",            # 10: Export ESP extreme values data​
+        "-1\n",            # 9: Export surface vertex data
+        "q\n",             # q: quit
+    ])
+
+    # Run Multiwfn
+    cmd = [multiwfn_path]
+    try:
+        returncode, output, _ = await _run_process(
+            cmd,
+            cwd=path,  # fchk_path is relative to path
+            input=script.encode(),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT
+        )
+    except FileNotFoundError as e:
+        # A missing working directory (path) also raises FileNotFoundError; only relabel a missing executable
+        if e.filename != multiwfn_path:
+            raise
+        raise FileNotFoundError(f"The specified Multiwn executable file does not exist: {multiwfn_path}")
+    if returncode != 0:
+        raise subprocess.CalledProcessError(returncode, cmd, output)
 
-    finally:
-        # Clean up temporary files
-        for temp_file in [script_path, output_path]:
-            if os.path.exists(temp_file):
-                try:
-                    os.remove(temp_file)
-                except Exception:
-                    pass  # Prevent cleanup failures from affecting the main logic
+    # Parse results
+    return parse_multiwfn_surface_analysis(output.decode("utf-8", errors="replace"))
 
 
 
 if __name__ == "__main__":
     # Support command-line options for network access
     import argparse
-    import sys
     
     parser = argparse.ArgumentParser(description='Gaussian MCP Server')
     parser.add_argument('--host', default='127.0.0.1', 
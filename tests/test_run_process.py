@@ -0,0 +1,102 @@
+import asyncio
+import os
+import stat
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    import gaussian_v1
+except ImportError:  # mcp is not installed
+    gaussian_v1 = None
+
+# Stand-in for g16: like a real Gaussian link, the grandchild shares the stderr pipe of g16
+FAKE_G16 = """#!/bin/sh
+{launcher}sleep 30 &
+echo $! > grandchild.pid
+wait
+"""
+
+
+def _running(pid):
+    """True if pid is alive and not a zombie."""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            return f.read().rsplit(")", 1)[1].split()[0] != "Z"
+    except FileNotFoundError:
+        return False
+
+
+@unittest.skipIf(gaussian_v1 is None, "mcp is not installed")
+@unittest.skipUnless(sys.platform.startswith("linux"), "Gaussian runs on Linux")
+class GaussianExecKillTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = self.tmp.name + "/"
+        self.old_path = os.environ["PATH"]
+        os.environ["PATH"] = self.tmp.name + os.pathsep + self.old_path
+
+    def tearDown(self):
+        os.environ["PATH"] = self.old_path
+        pid = self._grandchild()
+        if pid is not None and _running(pid):
+            os.kill(pid, 9)
+        self.tmp.cleanup()
+
+    def _fake_g16(self, launcher=""):
+        g16 = os.path.join(self.tmp.name, "g16")
+        with open(g16, "w") as f:
+            f.write(FAKE_G16.format(launcher=launcher))
+        os.chmod(g16, os.stat(g16).st_mode | stat.S_IEXEC)
+
+    def _grandchild(self):
+        try:
+            with open(self.path + "grandchild.pid") as f:
+                return int(f.read())
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _wait_for_grandchild(self):
+        for _ in range(100):
+            if self._grandchild() is not None:
+                return
+            time.sleep(0.05)
+
+    def test_timeout_kills_links(self):
+        self._fake_g16()
+        start = time.monotonic()
+        with self.assertRaisesRegex(RuntimeError, "time-out"):
+            asyncio.run(gaussian_v1.gaussian_exec("", "job.gjf", path=self.path, timeout=1))
+        self.assertLess(time.monotonic() - start, 5)
+        self.assertFalse(_running(self._grandchild()))
+
+    def test_cancel_kills_links(self):
+        self._fake_g16()
+
+        async def run():
+            task = asyncio.create_task(gaussian_v1.gaussian_exec("", "job.gjf", path=self.path))
+            await asyncio.get_running_loop().run_in_executor(None, self._wait_for_grandchild)
+            start = time.monotonic()
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+            return time.monotonic() - start
+
+        self.assertLess(asyncio.run(run()), 5)
+        self.assertFalse(_running(self._grandchild()))
+
+    def test_timeout_does_not_wait_for_detached_pipe_holder(self):
+        # The grandchild leaves the process group, so only closing the pipes lets the call return
+        self._fake_g16(launcher="setsid ")
+        start = time.monotonic()
+        with self.assertRaisesRegex(RuntimeError, "time-out"):
+            asyncio.run(gaussian_v1.gaussian_exec("", "job.gjf", path=self.path, timeout=1))
+        self.assertLess(time.monotonic() - start, 5)
+
+
+if __name__ == "__main__":
+    unittest.main()